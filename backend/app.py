@@ -1,16 +1,39 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory
 from flask_cors import CORS
-import base64, io, time, os, json, logging, sqlite3
+import base64, io, time, os, json, logging, sqlite3, threading, copy, gzip, hashlib, hmac
+from collections import deque
 from datetime import datetime
 from typing import Any, Dict
 from PIL import Image
 import numpy as np
 
+try:
+    import profiler
+    from emotion_store import PartitionedEmotionStore, tenant_slug
+except Exception:
+    from backend import profiler
+    from backend.emotion_store import PartitionedEmotionStore, tenant_slug
+
+# Optional: brotli for content API responses; gzip is always available
+try:
+    import brotli
+    _HAS_BROTLI = True
+except Exception:
+    _HAS_BROTLI = False
+
 BASE_DIR = os.path.dirname(__file__)
-DATA_DIR = os.path.join(BASE_DIR, "data")
+DATA_DIR = os.environ.get("FUNLEARN_DATA_DIR", os.path.join(BASE_DIR, "data"))
 ACTIVITIES_PATH = os.path.join(DATA_DIR, "activities.json")
 PROGRESS_PATH = os.path.join(DATA_DIR, "progress.json")
 DB_PATH = os.path.join(DATA_DIR, "emotions.sqlite3")
+# Emotion frames go to per-day (and per-school) partitions; set
+# EMOTION_PARTITIONS=0 to keep writing the single legacy `emotions` table.
+EMOTION_PARTITIONS = os.environ.get("EMOTION_PARTITIONS", "1") != "0"
+EMOTION_PARTITION_DIR = os.environ.get("EMOTION_PARTITION_DIR", os.path.join(DATA_DIR, "emotions"))
+EMOTION_STORE = PartitionedEmotionStore(EMOTION_PARTITION_DIR)
+# Schools that get their own partitions (comma separated). A `school` sent by
+# a client is ignored unless it is listed here.
+EMOTION_SCHOOLS = {s for s in (tenant_slug(x) for x in os.environ.get("EMOTION_SCHOOLS", "").split(",")) if s}
 FRONTEND_DIST = os.path.abspath(os.path.join(BASE_DIR, "..", "frontend", "dist"))
 
 app = Flask(__name__, static_folder=None)
@@ -98,8 +121,11 @@ def write_json(path: str, data: Any) -> None:
     with open(path, "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
 
-def save_emotion(user: str | None, module: str | None, activity: str | None, emotion: str, timestamp: str, session: str | None = None):
+def save_emotion(user: str | None, module: str | None, activity: str | None, emotion: str, timestamp: str, session: str | None = None, school: str | None = None):
     try:
+        if EMOTION_PARTITIONS:
+            EMOTION_STORE.save(user or "guest", module or None, activity or None, emotion, timestamp, session or None, tenant=school)
+            return
         with _db_conn() as conn:
             conn.execute(
                 "INSERT INTO emotions (user, module, activity, emotion, timestamp, session) VALUES (?,?,?,?,?,?)",
@@ -121,14 +147,96 @@ def create_session(email: str) -> str:
         logging.exception("create_session failed")
     return sid
 
+#############################################
+# Content caching
+#############################################
+# Content API bodies are a pure function of activities.json, so they are
+# rendered once per catalog version and kept alongside their compressed forms.
+CONTENT_CACHE_CONTROL = os.environ.get("CONTENT_CACHE_CONTROL", "public, max-age=60, must-revalidate")
+COMPRESS_MIN_BYTES = 1024
+
+_CATALOG_LOCK = threading.Lock()
+_CATALOG: dict[str, Any] = {"stat": None, "version": None, "data": None}
+_RENDERED: dict[str, dict[str, Any]] = {}
+
+def catalog_version() -> tuple[str | None, Any]:
+    """Return (version, data) for activities.json, reloading only when the file changes."""
+    try:
+        st = os.stat(ACTIVITIES_PATH)
+    except OSError:
+        return None, None
+    key = (st.st_mtime_ns, st.st_size)
+    with _CATALOG_LOCK:
+        if _CATALOG["stat"] != key:
+            with open(ACTIVITIES_PATH, "rb") as f:
+                raw = f.read()
+            _CATALOG["data"] = json.loads(raw.decode("utf-8-sig"))
+            _CATALOG["version"] = hashlib.sha256(raw).hexdigest()[:16]
+            _CATALOG["stat"] = key
+            _RENDERED.clear()
+        return _CATALOG["version"], _CATALOG["data"]
+
+def _pick_encoding() -> str | None:
+    accepted = {}
+    for part in (request.headers.get("Accept-Encoding") or "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    if _HAS_BROTLI and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+def cached_json(route_key: str, build) -> Response:
+    """Serve build(catalog) as JSON with a strong ETag, 304 revalidation and
+    gzip/brotli bodies cached per catalog version."""
+    version, data = catalog_version()
+    with _CATALOG_LOCK:
+        entry = _RENDERED.get(route_key)
+    if entry is None or entry["version"] != version:
+        obj = build(copy.deepcopy(data) if data is not None else None)
+        body = json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        entry = {
+            "version": version,
+            "etag": hashlib.sha256(body).hexdigest()[:20],
+            "identity": body,
+        }
+        if len(body) >= COMPRESS_MIN_BYTES:
+            entry["gzip"] = gzip.compress(body, compresslevel=6, mtime=0)
+            if _HAS_BROTLI:
+                entry["br"] = brotli.compress(body)
+        with _CATALOG_LOCK:
+            _RENDERED[route_key] = entry
+
+    encoding = _pick_encoding()
+    if encoding not in entry:
+        encoding = None
+    resp = Response(entry[encoding] if encoding else entry["identity"], mimetype="application/json")
+    # Encoded variants are different bytes, so they get their own strong tag
+    resp.set_etag(f"{entry['etag']}-{encoding}" if encoding else entry["etag"])
+    if encoding:
+        resp.headers["Content-Encoding"] = encoding
+    resp.headers["Cache-Control"] = CONTENT_CACHE_CONTROL
+    resp.vary.add("Accept-Encoding")
+    return resp.make_conditional(request)
+
 #############################################
 # Content APIs
 #############################################
 @app.route("/api/modules")
 def api_modules():
-    data = read_json(ACTIVITIES_PATH) or {}
+    return cached_json("modules", _build_modules)
+
+def _build_modules(data):
+    data = data or {}
     modules = data.get("modules", ["Math", "Science", "Reading", "Art"])
-    return jsonify({"modules": modules})
+    return {"modules": modules}
 
 def _gen_padding_questions(module: str, need: int, *, activity_id: str = "", existing: set | None = None):
     qs = []
@@ -214,7 +322,13 @@ def _gen_padding_questions(module: str, need: int, *, activity_id: str = "", exi
 
 @app.route("/api/activities/<module>")
 def api_activities_by_module(module: str):
-    data = read_json(ACTIVITIES_PATH) or {"activities": []}
+    _, data = catalog_version()
+    if not any(a.get("module", "").lower() == module.lower() for a in (data or {}).get("activities", [])):
+        return jsonify({"activities": []})
+    return cached_json(f"module:{module.lower()}", lambda data: _build_activities_by_module(data, module))
+
+def _build_activities_by_module(data, module: str):
+    data = data or {"activities": []}
     acts = [a for a in data.get("activities", []) if a.get("module", "").lower() == module.lower()]
     def ensure_min_questions(act, min_q=8):
         try:
@@ -230,11 +344,17 @@ def api_activities_by_module(module: str):
             pass
         return act
     acts = [ensure_min_questions(a) for a in acts]
-    return jsonify({"activities": acts})
+    return {"activities": acts}
 
 @app.route("/api/activity/<aid>")
 def api_activity_by_id(aid: str):
-    data = read_json(ACTIVITIES_PATH) or {"activities": []}
+    _, data = catalog_version()
+    if not any(a.get("id") == aid for a in (data or {}).get("activities", [])):
+        return jsonify({"error": "Not found"}), 404
+    return cached_json(f"activity:{aid}", lambda data: _build_activity(data, aid))
+
+def _build_activity(data, aid: str):
+    data = data or {"activities": []}
     for a in data.get("activities", []):
         if a.get("id") == aid:
             try:
@@ -246,26 +366,215 @@ def api_activity_by_id(aid: str):
                         quiz['questions'].extend(_gen_padding_questions(a.get('module',''), needed, activity_id=a.get('id',''), existing=existing))
             except Exception:
                 pass
-            return jsonify(a)
-    return jsonify({"error": "Not found"}), 404
+            return a
+    # api_activity_by_id checks the id first; never cache an error body as 200
+    raise KeyError(aid)
 
 #############################################
 # Emotion detection APIs
 #############################################
 _SMOOTH_CACHE: dict[str, list[str]] = {}
 
+#############################################
+# Adaptive polling
+#############################################
+# Clients are told when to send the next frame via `next_poll_ms`: faster while
+# the emotion is changing, slower when it is stable, no face is visible, or
+# this worker is saturated. Counters live per worker process; each worker also
+# publishes a snapshot to METRICS_DIR so /metrics/detect can sum all of them.
+POLL_MIN_MS = int(os.environ.get("POLL_MIN_MS", "3000"))
+POLL_BASE_MS = int(os.environ.get("POLL_BASE_MS", "10000"))
+POLL_MAX_MS = int(os.environ.get("POLL_MAX_MS", "30000"))
+_RATE_WINDOW_S = 60
+METRICS_DIR = os.environ.get("METRICS_DIR", os.path.join(DATA_DIR, "metrics"))
+_PUBLISH_EVERY_S = 5
+# Detections one worker can run at once (gunicorn --threads; 1 for sync workers)
+DETECT_CONCURRENCY = max(1, int(os.environ.get("DETECT_CONCURRENCY", "1")))
+
+_POLL_LOCK = threading.Lock()
+# key -> (stable streak, last seen); keys idle for a whole window are evicted
+_STABLE_STREAK: dict[str, tuple[int, float]] = {}
+_DETECT_TIMES: deque = deque()
+_DETECT_HINTS: deque = deque()
+_DETECT_BUSY: deque = deque()  # (finished at, seconds spent) per detection
+_DETECT_STATE = {"inflight": 0, "total": 0, "pruned_at": 0.0, "published_at": 0.0}
+
+def _worker_load() -> float:
+    """Saturation estimate, 0 when idle.
+
+    The main signal is utilisation: seconds this worker spent in detections
+    over the last window, per unit of DETECT_CONCURRENCY. Recent arrivals
+    times service time tracks backlog even under sync workers, where only one
+    request is ever in flight. Above 50% busy it grows linearly (1.0 at 100%).
+    Concurrent requests beyond DETECT_CONCURRENCY and a CPU run-queue above
+    one per core (1-minute loadavg, so it lags) add to it.
+    """
+    now = time.time()
+    with _POLL_LOCK:
+        while _DETECT_BUSY and _DETECT_BUSY[0][0] < now - _RATE_WINDOW_S:
+            _DETECT_BUSY.popleft()
+        busy = sum(d for _, d in _DETECT_BUSY) / (_RATE_WINDOW_S * DETECT_CONCURRENCY)
+        queued = max(0, _DETECT_STATE["inflight"] - DETECT_CONCURRENCY)
+    try:
+        cpu = os.getloadavg()[0] / max(1, os.cpu_count() or 1)
+    except Exception:
+        cpu = 0.0
+    return 2.0 * max(0.0, busy - 0.5) + 0.5 * queued + max(0.0, cpu - 1.0)
+
+def _prune_poll_state(now: float) -> None:
+    """Drop per-session state not seen within _RATE_WINDOW_S (caller holds _POLL_LOCK)."""
+    if now - _DETECT_STATE["pruned_at"] < _RATE_WINDOW_S:
+        return
+    _DETECT_STATE["pruned_at"] = now
+    cutoff = now - _RATE_WINDOW_S
+    for key in [k for k, (_, seen) in _STABLE_STREAK.items() if seen < cutoff]:
+        del _STABLE_STREAK[key]
+        _SMOOTH_CACHE.pop(key, None)
+
+def _next_poll_ms(key: str, window: list[str], face_found: bool) -> int:
+    now = time.time()
+    with _POLL_LOCK:
+        if len(window) >= 3 and len(set(window)) == 1:
+            streak = _STABLE_STREAK.get(key, (0, now))[0] + 1
+        else:
+            streak = 0
+        _STABLE_STREAK[key] = (streak, now)
+        _prune_poll_state(now)
+    if not face_found:
+        delay = 2 * POLL_BASE_MS
+    elif len(set(window)) > 1:
+        delay = POLL_MIN_MS
+    else:
+        delay = POLL_BASE_MS * (1 + 0.5 * min(streak, 4))
+    delay *= 1 + _worker_load()
+    return int(max(POLL_MIN_MS, min(POLL_MAX_MS, delay)))
+
+def _record_detect(now: float) -> None:
+    with _POLL_LOCK:
+        _DETECT_TIMES.append(now)
+        while _DETECT_TIMES and _DETECT_TIMES[0] < now - _RATE_WINDOW_S:
+            _DETECT_TIMES.popleft()
+
+def _record_poll_hint(now: float, hint_ms: int) -> None:
+    with _POLL_LOCK:
+        _DETECT_HINTS.append((now, hint_ms))
+        while _DETECT_HINTS and _DETECT_HINTS[0][0] < now - _RATE_WINDOW_S:
+            _DETECT_HINTS.popleft()
+
+def _worker_snapshot(now: float) -> dict:
+    cutoff = now - _RATE_WINDOW_S
+    with _POLL_LOCK:
+        times = [t for t in _DETECT_TIMES if t >= cutoff]
+        hints = [h for t, h in _DETECT_HINTS if t >= cutoff]
+        inflight = _DETECT_STATE["inflight"]
+        total = _DETECT_STATE["total"]
+        sessions = len(_STABLE_STREAK)
+    return {
+        "pid": os.getpid(),
+        "updated_at": now,
+        "requests_in_window": len(times),
+        "requests_per_s": round(len(times) / _RATE_WINDOW_S, 3),
+        "requests_total": total,
+        "inflight": inflight,
+        "sessions": sessions,
+        "hints_in_window": len(hints),
+        "avg_next_poll_ms": int(sum(hints) / len(hints)) if hints else None,
+        "worker_load": round(_worker_load(), 3),
+    }
+
+def _publish_snapshot(now: float) -> None:
+    with _POLL_LOCK:
+        if now - _DETECT_STATE["published_at"] < _PUBLISH_EVERY_S:
+            return
+        _DETECT_STATE["published_at"] = now
+    snap = _worker_snapshot(now)
+    try:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        path = os.path.join(METRICS_DIR, f"detect-{snap['pid']}.json")
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(snap, f)
+        os.replace(tmp, path)
+    except OSError:
+        logging.exception("publishing detect metrics failed")
+
+@app.route("/metrics/detect")
+def metrics_detect():
+    """Effective /detect_emotion rate summed over every worker that reported
+    within the window, with the per-worker snapshots alongside. Snapshots
+    older than the window (restarted or recycled workers) are deleted."""
+    now = time.time()
+    own = _worker_snapshot(now)
+    workers = {own["pid"]: own}
+    try:
+        names = os.listdir(METRICS_DIR)
+    except OSError:
+        names = []
+    for name in names:
+        if not (name.startswith("detect-") and name.endswith(".json")):
+            continue
+        path = os.path.join(METRICS_DIR, name)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                snap = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if snap.get("updated_at", 0) < now - _RATE_WINDOW_S:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        if snap.get("pid") in workers:
+            continue
+        workers[snap["pid"]] = snap
+    live = sorted(workers.values(), key=lambda w: w["pid"])
+    hints = sum(w["hints_in_window"] for w in live)
+    return jsonify({
+        "window_s": _RATE_WINDOW_S,
+        "total": {
+            "workers": len(live),
+            "requests_in_window": sum(w["requests_in_window"] for w in live),
+            "requests_per_s": round(sum(w["requests_in_window"] for w in live) / _RATE_WINDOW_S, 3),
+            "inflight": sum(w["inflight"] for w in live),
+            "sessions": sum(w["sessions"] for w in live),
+            "avg_next_poll_ms": int(sum((w["avg_next_poll_ms"] or 0) * w["hints_in_window"] for w in live) / hints) if hints else None,
+        },
+        "workers": live,
+    })
+
 @app.route("/detect_emotion", methods=["POST"])
 def detect_emotion():
+    started = time.time()
+    _record_detect(started)
+    with _POLL_LOCK:
+        _DETECT_STATE["inflight"] += 1
+        _DETECT_STATE["total"] += 1
+    try:
+        return _detect_emotion()
+    finally:
+        finished = time.time()
+        with _POLL_LOCK:
+            _DETECT_STATE["inflight"] -= 1
+            _DETECT_BUSY.append((finished, finished - started))
+        _publish_snapshot(finished)
+
+def _detect_emotion():
+    timer = profiler.stage_timer("detect_emotion", force=request.headers.get("X-Profile-Request") == "1" and _debug_authorized())
     try:
         payload = request.get_json(force=True)
     except Exception:
         return jsonify({"error": "Invalid JSON"}), 400
+    timer.mark("parse")
 
     image_b64 = (payload or {}).get("image") or (payload or {}).get("image_b64") or (payload or {}).get("image_base64")
     user = (payload or {}).get("user") or "guest"
     module = (payload or {}).get("module")
     activity = (payload or {}).get("activity")
     session_id = (payload or {}).get("session_id")
+    school = tenant_slug((payload or {}).get("school"))
+    if school not in EMOTION_SCHOOLS:
+        school = None
     if not image_b64:
         return jsonify({"error": "No image provided"}), 400
 
@@ -279,25 +588,31 @@ def detect_emotion():
         image_bytes = base64.b64decode(image_b64)
         image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
         img_np = np.array(image)
+        timer.mark("decode")
+        on_model_error = (lambda e: timer.note("model_error", repr(e))) if timer.enabled else None
         try:
             try:
                 from model import infer_emotion_detailed as _detailed
             except Exception:
                 from backend.model import infer_emotion_detailed as _detailed
-            d_label, d_conf, d_face = _detailed(img_np)
+            d_label, d_conf, d_face = _detailed(img_np, on_error=on_model_error)
             label, confidence, face_found = d_label, float(d_conf), bool(d_face)
-        except Exception:
+        except Exception as e:
+            timer.note("detailed_error", repr(e))
             try:
                 try:
                     from model import infer_emotion
                 except Exception:
                     from backend.model import infer_emotion
-                label = infer_emotion(img_np)
+                label = infer_emotion(img_np, on_error=on_model_error)
                 confidence = 0.5
                 face_found = False
-            except Exception:
-                pass
-    except Exception:
+            except Exception as e:
+                timer.note("infer_error", repr(e))
+        timer.mark("infer")
+    except Exception as e:
+        timer.note("fallback", repr(e))
+        timer.mark("fallback")
         logging.exception("/detect_emotion failed, using fallback")
         import random
         label = random.choice(["happy", "neutral", "sad", "frustrated"]) 
@@ -305,9 +620,10 @@ def detect_emotion():
         face_found = False
 
     try:
-        save_emotion(user, module, activity, label, datetime.utcfromtimestamp(ts_epoch).isoformat()+"Z", session=session_id)
+        save_emotion(user, module, activity, label, datetime.utcfromtimestamp(ts_epoch).isoformat()+"Z", session=session_id, school=school)
     except Exception:
         pass
+    timer.mark("save")
 
     try:
         key = f"{user}|{module}|{activity}"
@@ -320,13 +636,26 @@ def detect_emotion():
         counts = Counter(arr)
         label = counts.most_common(1)[0][0]
     except Exception:
-        pass
+        arr = [label]
+
+    next_poll_ms = POLL_BASE_MS
+    try:
+        next_poll_ms = _next_poll_ms(f"{user}|{module}|{activity}", arr, face_found)
+    except Exception:
+        logging.exception("next_poll_ms failed")
+    _record_poll_hint(time.time(), next_poll_ms)
+    timer.mark("smooth")
 
     try:
-        logging.info(f"detect_emotion user={user} module={module} activity={activity} face_found={face_found} label={label} conf={confidence}")
+        logging.info(f"detect_emotion user={user} module={module} activity={activity} face_found={face_found} label={label} conf={confidence} next_poll_ms={next_poll_ms}")
     except Exception:
         pass
-    return jsonify({"emotion": label, "confidence": confidence, "timestamp": ts_epoch, "face_found": face_found})
+    resp = jsonify({"emotion": label, "confidence": confidence, "timestamp": ts_epoch, "face_found": face_found, "next_poll_ms": next_poll_ms})
+    if timer.enabled:
+        entry = timer.finish()
+        logging.info(f"detect_emotion timings total_ms={entry['total_ms']} stages={entry['stages']} notes={entry['notes']}")
+        resp.headers["Server-Timing"] = timer.server_timing()
+    return resp
 
 @app.route("/detect", methods=["POST"])
 def detect_alias():
@@ -422,6 +751,87 @@ def api_badges(user: str):
         logging.exception("/api/badges failed")
         return jsonify({"badges": []}), 200
 
+#############################################
+# Debug / profiling APIs
+#############################################
+# Disabled (404) unless DEBUG_PROFILE_TOKEN is set; callers pass the token in
+# the X-Debug-Token header. Profiles cover the worker that serves the request,
+# so with gunicorn sync workers use background=1 and fetch
+# /debug/profile/last?pid=<pid from the 202>; finished profiles are written to
+# PROFILE_DIR so any worker can return them.
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(DATA_DIR, "profiles"))
+_PROFILE_LOCK = threading.Lock()
+_LAST_PROFILE: dict[str, Any] = {"profiler": None}
+
+def _debug_authorized() -> bool:
+    token = profiler.PROFILE_TOKEN
+    if not token:
+        return False
+    provided = request.headers.get("X-Debug-Token") or ""
+    return hmac.compare_digest(provided.encode("utf-8"), token.encode("utf-8"))
+
+def _profile_path(pid: int) -> str:
+    return os.path.join(PROFILE_DIR, f"profile-{pid}.collapsed")
+
+def _profile_response(text: str, pid: int, stamp: float) -> Response:
+    resp = Response(text, mimetype="text/plain")
+    resp.headers["Content-Disposition"] = f"attachment; filename=profile-{pid}-{int(stamp)}.collapsed"
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
+
+@app.route("/debug/profile")
+def debug_profile():
+    if not profiler.PROFILE_TOKEN:
+        return jsonify({"error": "Not found"}), 404
+    if not _debug_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+    try:
+        seconds = float(request.args.get("seconds", "10"))
+        hz = int(request.args.get("hz", "100"))
+    except ValueError:
+        return jsonify({"error": "seconds and hz must be numeric"}), 400
+    with _PROFILE_LOCK:
+        current = _LAST_PROFILE["profiler"]
+        if current is not None and current.running():
+            return jsonify({"error": "profile already running"}), 409
+        prof = profiler.SamplingProfiler(seconds, hz, out_path=_profile_path(os.getpid())).start()
+        _LAST_PROFILE["profiler"] = prof
+    if request.args.get("background") == "1":
+        return jsonify({"ok": True, "pid": os.getpid(), "seconds": prof.seconds}), 202
+    prof.join()
+    resp = _profile_response(prof.collapsed(), os.getpid(), prof.started_at)
+    resp.headers["X-Profile-Samples"] = str(prof.samples)
+    return resp
+
+@app.route("/debug/profile/last")
+def debug_profile_last():
+    if not profiler.PROFILE_TOKEN:
+        return jsonify({"error": "Not found"}), 404
+    if not _debug_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+    try:
+        pid = int(request.args.get("pid") or os.getpid())
+    except ValueError:
+        return jsonify({"error": "pid must be an integer"}), 400
+    prof = _LAST_PROFILE["profiler"]
+    if pid == os.getpid() and prof is not None and prof.running():
+        return jsonify({"error": "profile still running"}), 409
+    try:
+        with open(_profile_path(pid), "r", encoding="utf-8") as f:
+            text = f.read()
+        stamp = os.path.getmtime(_profile_path(pid))
+    except OSError:
+        return jsonify({"error": f"no finished profile for pid {pid}"}), 404
+    return _profile_response(text, pid, stamp)
+
+@app.route("/debug/timings")
+def debug_timings():
+    if not profiler.PROFILE_TOKEN:
+        return jsonify({"error": "Not found"}), 404
+    if not _debug_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify({"sample_rate": profiler.PROFILE_SAMPLE_RATE, "timings": profiler.recent_timings()})
+
 #############################################
 # Serve built frontend (if present)
 #############################################
@@ -429,7 +839,7 @@ def api_badges(user: str):
 @app.route('/<path:path>')
 def serve_frontend(path: str):
     # Do not intercept API and service routes
-    if path.startswith(('api/', 'detect', 'login', 'emotions')):
+    if path.startswith(('api/', 'detect', 'login', 'emotions', 'metrics', 'debug')):
         return jsonify({"error": "Not found"}), 404
     try:
         if os.path.exists(FRONTEND_DIST):
@@ -0,0 +1,60 @@
+"""
+Write-throughput benchmark for the partitioned emotion store.
+Runs W writer processes for a fixed time against 1, 2, 4, ... partitions
+(one school per partition, writers assigned round-robin) and prints rows/s.
+Run: python backend/bench_partitions.py [--writers 8] [--seconds 5]
+"""
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from emotion_store import PartitionedEmotionStore
+
+
+def _writer(root, tenant, seconds, out):
+    store = PartitionedEmotionStore(root)
+    ts = datetime.utcnow().isoformat() + "Z"
+    n = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        store.save("bench", "Math", "a1", "happy", ts, None, tenant=tenant)
+        n += 1
+    out.put(n)
+
+
+def run(partitions, writers, seconds):
+    with tempfile.TemporaryDirectory() as root:
+        out = mp.Queue()
+        procs = [
+            mp.Process(target=_writer, args=(root, f"school{i % partitions}" if partitions > 1 else None, seconds, out))
+            for i in range(writers)
+        ]
+        for p in procs:
+            p.start()
+        total = sum(out.get() for _ in procs)
+        for p in procs:
+            p.join()
+    return total / seconds
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--writers", type=int, default=8)
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--partitions", type=int, nargs="*", default=[1, 2, 4, 8])
+    args = ap.parse_args()
+    base = None
+    print(f"{'partitions':>10} {'writers':>8} {'rows/s':>10} {'speedup':>8}")
+    for k in args.partitions:
+        rate = run(k, args.writers, args.seconds)
+        base = base or rate
+        print(f"{k:>10} {args.writers:>8} {rate:>10.0f} {rate / base:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
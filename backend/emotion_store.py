@@ -0,0 +1,281 @@
+"""
+emotion_store.py - emotion rows partitioned into one SQLite file per day
+(and optionally per school/tenant), so concurrent writers only contend with
+others writing the same partition.
+
+Layout: <root>/emotions-YYYY-MM-DD.sqlite3 or
+        <root>/emotions-YYYY-MM-DD--<tenant>.sqlite3
+
+Writes go to the partition for the row's UTC date. Range queries ATTACH only
+the partitions whose date falls in the range (read-only), plus the legacy
+single-table database if one is given, and UNION ALL them. The first write of
+a new day seals the earlier partitions (checkpointed, closed, chmod
+read-only). A partition another thread or process still has open cannot be
+sealed yet; that is logged and retried when writers drop their old-day
+connections and every SEAL_RETRY_S while any remain. archive() then moves
+sealed files away.
+
+Run: python backend/emotion_store.py seal|archive [--root DIR] [--dest DIR] [--before YYYY-MM-DD]
+"""
+
+import argparse
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import stat
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS emotions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user TEXT,
+    module TEXT,
+    activity TEXT,
+    emotion TEXT,
+    timestamp TEXT,
+    session TEXT
+)
+"""
+_COLUMNS = "user, module, activity, emotion, timestamp, session"
+_NAME_RE = re.compile(r"^emotions-(\d{4}-\d{2}-\d{2})(?:--([A-Za-z0-9_-]+))?\.sqlite3$")
+# SQLITE_MAX_ATTACHED defaults to 10; keep one slot spare
+_ATTACH_BATCH = 9
+# Writer connections kept open per thread (least recently used are closed)
+MAX_OPEN_PER_THREAD = 8
+SEAL_RETRY_S = 60
+
+
+def tenant_slug(tenant: str | None) -> str | None:
+    if not tenant:
+        return None
+    slug = re.sub(r"[^A-Za-z0-9_-]+", "_", str(tenant)).strip("_")[:64]
+    return slug or None
+
+
+def _as_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _partition_day(path: str) -> date | None:
+    m = _NAME_RE.match(os.path.basename(path))
+    return date.fromisoformat(m.group(1)) if m else None
+
+
+def _is_sealed(path: str) -> bool:
+    return not (os.stat(path).st_mode & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+
+
+class PartitionedEmotionStore:
+    def __init__(self, root: str, max_open: int = MAX_OPEN_PER_THREAD):
+        self.root = root
+        self.max_open = max_open
+        self._local = threading.local()
+        self._known: set[str] = set()
+        self._lock = threading.Lock()
+        self._active_day: date | None = None
+        # Cutoff of a seal() that left partitions unsealed, and when to retry it
+        self._seal_pending: date | None = None
+        self._seal_retry_at = 0.0
+
+    def partition_path(self, day, tenant: str | None = None) -> str:
+        slug = tenant_slug(tenant)
+        name = f"emotions-{_as_date(day).isoformat()}" + (f"--{slug}" if slug else "") + ".sqlite3"
+        return os.path.join(self.root, name)
+
+    def partitions(self, start=None, end=None, tenant: str | None = None, all_tenants: bool = False) -> list[tuple[date, str | None, str]]:
+        """List existing partitions as (day, tenant, path), oldest first."""
+        if not os.path.isdir(self.root):
+            return []
+        lo = _as_date(start) if start else None
+        hi = _as_date(end) if end else None
+        slug = tenant_slug(tenant)
+        out = []
+        for name in os.listdir(self.root):
+            m = _NAME_RE.match(name)
+            if not m:
+                continue
+            day, part_tenant = date.fromisoformat(m.group(1)), m.group(2)
+            if (lo and day < lo) or (hi and day > hi):
+                continue
+            if not all_tenants and part_tenant != slug:
+                continue
+            out.append((day, part_tenant, os.path.join(self.root, name)))
+        return sorted(out, key=lambda p: (p[0], p[1] or ""))
+
+    def _conns(self) -> OrderedDict:
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = OrderedDict()
+        return conns
+
+    def _writer(self, path: str, day: date) -> sqlite3.Connection:
+        conns = self._conns()
+        conn = conns.get(path)
+        if conn is not None:
+            conns.move_to_end(path)
+            return conn
+        rolled = self._roll_over(day)
+        os.makedirs(self.root, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if path not in self._known:
+            conn.execute(_SCHEMA)
+            conn.commit()
+            with self._lock:
+                self._known.add(path)
+        conns[path] = conn
+        # Earlier days only take late frames, so drop them; then cap by LRU
+        dropped = [p for p in conns if _partition_day(p) != day]
+        for old in dropped:
+            conns.pop(old).close()
+        while len(conns) > self.max_open:
+            conns.popitem(last=False)[1].close()
+        if dropped and not rolled:
+            self._retry_seal(force=True)
+        return conn
+
+    def _roll_over(self, day: date) -> bool:
+        """Seal earlier partitions the first time a later day is written."""
+        with self._lock:
+            if self._active_day is not None and day <= self._active_day:
+                return False
+            self._active_day = day
+        self.seal(before=day)
+        return True
+
+    def _retry_seal(self, force: bool = False) -> None:
+        pending = self._seal_pending
+        if pending is None or (not force and time.monotonic() < self._seal_retry_at):
+            return
+        self.seal(before=pending)
+
+    def save(self, user, module, activity, emotion: str, timestamp: str, session=None, tenant: str | None = None) -> None:
+        day = _as_date(timestamp)
+        if self._active_day is not None and day < self._active_day:
+            raise ValueError(f"partition for {day} is sealed")
+        self._retry_seal()
+        conn = self._writer(self.partition_path(day, tenant), day)
+        with conn:
+            conn.execute(
+                f"INSERT INTO emotions ({_COLUMNS}) VALUES (?,?,?,?,?,?)",
+                [user, module, activity, emotion, timestamp, session],
+            )
+
+    def query(self, start, end, tenant: str | None = None, all_tenants: bool = False, user: str | None = None,
+              legacy_path: str | None = None, partitioned: bool = True) -> list[dict]:
+        """Rows with start <= date(timestamp) <= end, ordered by timestamp.
+
+        Only partitions in the range are attached. `legacy_path` adds the old
+        single-table database (its rows have no tenant)."""
+        sources = self.partitions(start, end, tenant, all_tenants) if partitioned else []
+        if legacy_path and os.path.exists(legacy_path) and (all_tenants or not tenant_slug(tenant)):
+            sources.append((None, None, legacy_path))
+        lo = _as_date(start).isoformat()
+        hi = (_as_date(end) + timedelta(days=1)).isoformat()
+        where = "timestamp >= ? AND timestamp < ?" + (" AND user = ?" if user else "")
+        args = [lo, hi] + ([user] if user else [])
+        rows: list[dict] = []
+        conn = sqlite3.connect("file::memory:", uri=True)
+        try:
+            for i in range(0, len(sources), _ATTACH_BATCH):
+                batch = sources[i:i + _ATTACH_BATCH]
+                selects, params = [], []
+                for j, (_, part_tenant, path) in enumerate(batch):
+                    conn.execute(f"ATTACH DATABASE ? AS p{j}", [f"file:{path}?mode=ro"])
+                    selects.append(f"SELECT ? AS tenant, {_COLUMNS} FROM p{j}.emotions WHERE {where}")
+                    params += [part_tenant] + args
+                try:
+                    cur = conn.execute(" UNION ALL ".join(selects), params)
+                    names = [d[0] for d in cur.description]
+                    rows.extend(dict(zip(names, r)) for r in cur.fetchall())
+                finally:
+                    for j in range(len(batch)):
+                        conn.execute(f"DETACH DATABASE p{j}")
+        finally:
+            conn.close()
+        # Batches are merged here so the order holds across all of them
+        rows.sort(key=lambda r: r["timestamp"] or "")
+        return rows
+
+    def seal(self, before=None) -> list[str]:
+        """Close and mark read-only every partition dated before `before` (default: today UTC)."""
+        cutoff = _as_date(before or datetime.utcnow())
+        conns = self._conns()
+        sealed, failed = [], []
+        for _, _, path in self.partitions(end=cutoff - timedelta(days=1), all_tenants=True):
+            if path in conns:
+                conns.pop(path).close()
+            try:
+                if _is_sealed(path):
+                    continue
+                # Fold the WAL back in so the .sqlite3 file is self-contained;
+                # this needs every other connection to the file closed
+                conn = sqlite3.connect(path, timeout=1)
+                try:
+                    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                    mode = conn.execute("PRAGMA journal_mode=DELETE").fetchone()[0]
+                finally:
+                    conn.close()
+                if str(mode).lower() != "delete":
+                    raise sqlite3.OperationalError(f"journal_mode is still {mode}")
+                os.chmod(path, 0o444)
+            except (sqlite3.Error, OSError) as e:
+                logging.warning("sealing %s failed, will retry: %s", path, e)
+                failed.append(path)
+                continue
+            with self._lock:
+                self._known.discard(path)
+            sealed.append(path)
+        with self._lock:
+            if failed:
+                self._seal_pending = max(cutoff, self._seal_pending or cutoff)
+                self._seal_retry_at = time.monotonic() + SEAL_RETRY_S
+            elif self._seal_pending is not None and cutoff >= self._seal_pending:
+                self._seal_pending = None
+        return sealed
+
+    def archive(self, dest: str, before=None) -> list[str]:
+        """Seal partitions dated before `before` and move them to `dest`."""
+        cutoff = _as_date(before or datetime.utcnow())
+        self.seal(cutoff)
+        os.makedirs(dest, exist_ok=True)
+        moved = []
+        for _, _, path in self.partitions(end=cutoff - timedelta(days=1), all_tenants=True):
+            if not _is_sealed(path):
+                continue
+            target = os.path.join(dest, os.path.basename(path))
+            shutil.move(path, target)
+            moved.append(target)
+        return moved
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Seal or archive past emotion partitions.")
+    ap.add_argument("command", choices=["seal", "archive"])
+    ap.add_argument("--root", default=os.environ.get("EMOTION_PARTITION_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "emotions")))
+    ap.add_argument("--dest", help="archive directory (archive only)")
+    ap.add_argument("--before", help="YYYY-MM-DD, default today (UTC)")
+    args = ap.parse_args()
+    store = PartitionedEmotionStore(args.root)
+    if args.command == "seal":
+        done = store.seal(args.before)
+    else:
+        if not args.dest:
+            ap.error("archive needs --dest")
+        done = store.archive(args.dest, args.before)
+    for path in done:
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+"""
+loadsim.py - classroom load simulator and capacity-planning harness.
+
+Each virtual student logs in (/login), loads a module (/api/activities/<module>),
+streams webcam frames to /detect_emotion and posts /api/progress now and then,
+the same sequence the frontend drives during a lesson. Frames go out every
+--interval-ms; --adaptive follows the server's next_poll_ms instead, which
+needs a --frame with a visible face to be representative.
+
+Against a backend that is already running:
+  python backend/loadsim.py --url http://127.0.0.1:5000 --students 10 30
+
+Or let the harness start gunicorn itself and sweep worker layouts:
+  python backend/loadsim.py --workers 1 2 4 --worker-class sync gthread --students 10 30 60
+
+For every run it prints p50/p99 latency, error rate, CPU % and RSS per worker,
+then the largest student count each layout held within --slo-p99-ms and
+--max-error-rate. Spawned servers use a throwaway copy of data/, so the
+real progress.json and emotion databases are never touched.
+"""
+import argparse
+import base64
+import http.client
+import io
+import json
+import os
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+# Optional: psutil gives portable CPU/RSS numbers; /proc is used otherwise
+try:
+    import psutil
+    _HAS_PSUTIL = True
+except Exception:
+    _HAS_PSUTIL = False
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODULES = ["Math", "Science", "Reading", "Art"]
+
+
+def load_frame(path: str) -> str:
+    with open(path, "rb") as f:
+        raw = f.read()
+    mime = "image/png" if raw[:8] == b"\x89PNG\r\n\x1a\n" else "image/jpeg"
+    return f"data:{mime};base64," + base64.b64encode(raw).decode("ascii")
+
+
+def make_frame(width: int, height: int, quality: int = 70) -> str:
+    """A noisy JPEG data URL roughly the size of a real webcam frame (no face in it)."""
+    from PIL import Image
+    import numpy as np
+    arr = np.random.default_rng(0).integers(60, 200, size=(height, width, 3), dtype=np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(arr).save(buf, format="JPEG", quality=quality)
+    return "data:image/jpeg;base64," + base64.b64encode(buf.getvalue()).decode("ascii")
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+
+    def record(self, endpoint: str, ms: float, ok: bool):
+        with self.lock:
+            self.latencies.setdefault(endpoint, []).append(ms)
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def summary(self) -> dict:
+        with self.lock:
+            out = {}
+            all_ms, all_err = [], 0
+            for ep, values in self.latencies.items():
+                out[ep] = _describe(values, self.errors.get(ep, 0))
+                all_ms += values
+                all_err += self.errors.get(ep, 0)
+            out["all"] = _describe(all_ms, all_err)
+            return out
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[idx]
+
+
+def _describe(values: list[float], errors: int) -> dict:
+    v = sorted(values)
+    return {
+        "requests": len(v),
+        "errors": errors,
+        "error_rate": (errors / len(v)) if v else 0.0,
+        "p50_ms": round(_percentile(v, 50), 1),
+        "p99_ms": round(_percentile(v, 99), 1),
+    }
+
+
+def _request(url: str, body=None, timeout: float = 30.0):
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    req = urllib.request.Request(url, data=data, method="POST" if data is not None else "GET")
+    if data is not None:
+        req.add_header("Content-Type", "application/json")
+    req.add_header("Accept-Encoding", "gzip")
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        raw = resp.read()
+        if resp.headers.get("Content-Encoding") == "gzip":
+            import gzip
+            raw = gzip.decompress(raw)
+        return resp.status, raw
+
+
+def _timed(stats: Stats, endpoint: str, url: str, body=None):
+    t0 = time.perf_counter()
+    ok, payload = False, None
+    try:
+        status, raw = _request(url, body)
+        ok = 200 <= status < 400
+        payload = json.loads(raw) if raw else None
+    except (urllib.error.URLError, http.client.HTTPException, OSError, ValueError):
+        ok = False
+    stats.record(endpoint, (time.perf_counter() - t0) * 1000.0, ok)
+    return payload
+
+
+def student(idx: int, base: str, frame: str, args, stats: Stats, stop: threading.Event):
+    rnd = random.Random(idx)
+    # Stagger arrivals so the class does not log in on the same millisecond
+    if stop.wait(rnd.uniform(0, args.ramp)):
+        return
+    email = f"student{idx}@loadsim.local"
+    login = _timed(stats, "login", f"{base}/login", {"email": email, "password": "x"}) or {}
+    module = rnd.choice(MODULES)
+    acts = (_timed(stats, "activities", f"{base}/api/activities/{module}") or {}).get("activities") or [{"id": "unknown"}]
+    activity = rnd.choice(acts).get("id", "unknown")
+    next_progress = time.monotonic() + rnd.uniform(args.progress_every / 2, args.progress_every)
+    while not stop.is_set():
+        res = _timed(stats, "detect_emotion", f"{base}/detect_emotion", {
+            "image": frame, "user": email, "module": module, "activity": activity,
+            "session_id": login.get("session_id"), "school": f"school{idx % args.schools}" if args.schools > 1 else None,
+        }) or {}
+        if time.monotonic() >= next_progress:
+            _timed(stats, "progress", f"{base}/api/progress", {
+                "user": email, "module": module, "activity": activity,
+                "score": rnd.randint(0, 8), "total": 8,
+            })
+            next_progress = time.monotonic() + args.progress_every
+        delay_ms = res.get("next_poll_ms", args.interval_ms) if args.adaptive else args.interval_ms
+        stop.wait(delay_ms / 1000.0 * rnd.uniform(0.9, 1.1))
+
+
+def _proc_sample(pid: int):
+    """Return (cpu_seconds, rss_bytes) for a pid, or None if it is gone."""
+    try:
+        if _HAS_PSUTIL:
+            p = psutil.Process(pid)
+            t = p.cpu_times()
+            return t.user + t.system, p.memory_info().rss
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        ticks = os.sysconf("SC_CLK_TCK")
+        cpu = (int(fields[11]) + int(fields[12])) / ticks
+        rss = int(fields[21]) * os.sysconf("SC_PAGE_SIZE")
+        return cpu, rss
+    except Exception:
+        return None
+
+
+def _children(pid: int) -> list[int]:
+    if _HAS_PSUTIL:
+        try:
+            return [c.pid for c in psutil.Process(pid).children()]
+        except Exception:
+            return []
+    kids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                if int(f.read().rsplit(")", 1)[1].split()[1]) == pid:
+                    kids.append(int(entry))
+        except Exception:
+            continue
+    return kids
+
+
+def run_load(base: str, students: int, frame: str, args, server_pid: int | None = None) -> dict:
+    stats = Stats()
+    stop = threading.Event()
+    threads = [threading.Thread(target=student, args=(i, base, frame, args, stats, stop), daemon=True) for i in range(students)]
+    workers = _children(server_pid) if server_pid else []
+    before = {pid: _proc_sample(pid) for pid in workers}
+    t0 = time.monotonic()
+    for t in threads:
+        t.start()
+    stop.wait(args.duration)
+    stop.set()
+    for t in threads:
+        t.join(timeout=35)
+    elapsed = time.monotonic() - t0
+    per_worker = []
+    for pid in workers:
+        a, b = before.get(pid), _proc_sample(pid)
+        if a and b:
+            per_worker.append({"pid": pid, "cpu_pct": round(100.0 * (b[0] - a[0]) / elapsed, 1), "rss_mb": round(b[1] / 2**20, 1)})
+    summary = stats.summary()
+    summary["students"] = students
+    summary["duration_s"] = round(elapsed, 1)
+    summary["detect_rps"] = round(summary.get("detect_emotion", {}).get("requests", 0) / elapsed, 2)
+    summary["workers"] = per_worker
+    return summary
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_healthy(base: str, timeout: float = 60.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if _request(f"{base}/health", timeout=2)[0] == 200:
+                return True
+        except Exception:
+            time.sleep(0.3)
+    return False
+
+
+def start_gunicorn(workers: int, worker_class: str, threads: int, data_dir: str, schools: int = 1):
+    port = _free_port()
+    cmd = [sys.executable, "-m", "gunicorn", "wsgi:app", "--bind", f"127.0.0.1:{port}",
+           "--workers", str(workers), "--worker-class", worker_class, "--timeout", "120"]
+    if worker_class == "gthread":
+        cmd += ["--threads", str(threads)]
+    env = dict(os.environ, FUNLEARN_DATA_DIR=data_dir)
+    if schools > 1:
+        # The server ignores schools that are not allowlisted
+        env["EMOTION_SCHOOLS"] = ",".join(f"school{i}" for i in range(schools))
+    proc = subprocess.Popen(cmd, cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f"http://127.0.0.1:{port}"
+    if not _wait_healthy(base):
+        proc.kill()
+        raise RuntimeError(f"gunicorn did not become healthy: {' '.join(cmd)}")
+    return proc, base
+
+
+def _print_row(label: str, s: dict):
+    a = s["all"]
+    d = s.get("detect_emotion", _describe([], 0))
+    cpu = ",".join(str(w["cpu_pct"]) for w in s["workers"]) or "-"
+    rss = ",".join(str(w["rss_mb"]) for w in s["workers"]) or "-"
+    print(f"{label:<14} {s['students']:>8} {a['requests']:>7} {a['error_rate'] * 100:>6.2f}% "
+          f"{d['p50_ms']:>8} {d['p99_ms']:>8} {a['p99_ms']:>8} {s['detect_rps']:>8}  cpu%={cpu} rss_mb={rss}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--url", help="existing backend to load; skips the gunicorn sweep")
+    ap.add_argument("--students", type=int, nargs="+", default=[10, 30, 60])
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    ap.add_argument("--worker-class", nargs="+", default=["sync", "gthread"])
+    ap.add_argument("--threads", type=int, default=4, help="threads per gthread worker")
+    ap.add_argument("--duration", type=float, help="seconds per run (default: 10 frame intervals)")
+    ap.add_argument("--ramp", type=float, default=5.0, help="seconds over which students join")
+    ap.add_argument("--interval-ms", type=int, default=10_000, help="frame interval (WebcamEmotion default)")
+    ap.add_argument("--adaptive", action="store_true",
+                    help="follow next_poll_ms hints; only meaningful with a --frame that contains a face")
+    ap.add_argument("--frame", help="image file to send instead of a generated noise frame")
+    ap.add_argument("--progress-every", type=float, default=60.0, help="seconds between progress posts")
+    ap.add_argument("--schools", type=int, default=1)
+    ap.add_argument("--frame-size", default="320x240")
+    ap.add_argument("--slo-p99-ms", type=float, default=1000.0)
+    ap.add_argument("--max-error-rate", type=float, default=0.01)
+    ap.add_argument("--json", help="also write every run to this file")
+    args = ap.parse_args()
+
+    if args.duration is None:
+        args.duration = 10 * args.interval_ms / 1000.0
+    if args.frame:
+        frame = load_frame(args.frame)
+    else:
+        w, h = (int(x) for x in args.frame_size.lower().split("x"))
+        frame = make_frame(w, h)
+        if args.adaptive:
+            print("warning: the generated frame has no face, so the server will always back off (use --frame)")
+    results = []
+    print(f"{'layout':<14} {'students':>8} {'reqs':>7} {'errors':>7} {'det_p50':>8} {'det_p99':>8} {'all_p99':>8} {'det_rps':>8}")
+
+    if args.url:
+        layouts = [("external", None, None)]
+    else:
+        layouts = [(f"{wc}x{n}", n, wc) for wc in args.worker_class for n in args.workers]
+
+    for label, n, wc in layouts:
+        proc = tmp = None
+        try:
+            if args.url:
+                base, pid = args.url.rstrip("/"), None
+            else:
+                tmp = tempfile.mkdtemp(prefix="funlearn-loadsim-")
+                shutil.copy(os.path.join(BASE_DIR, "data", "activities.json"), tmp)
+                proc, base = start_gunicorn(n, wc, args.threads, tmp, args.schools)
+                pid = proc.pid
+            for count in args.students:
+                s = run_load(base, count, frame, args, pid)
+                s.update({"layout": label, "workers_n": n, "worker_class": wc})
+                results.append(s)
+                _print_row(label, s)
+        finally:
+            if proc is not None:
+                proc.send_signal(signal.SIGTERM)
+                try:
+                    proc.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+            if tmp:
+                shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"\nCapacity (p99 <= {args.slo_p99_ms:.0f} ms, errors <= {args.max_error_rate * 100:.1f}%):")
+    for label in dict.fromkeys(r["layout"] for r in results):
+        ok = [r["students"] for r in results if r["layout"] == label
+              and r["all"]["p99_ms"] <= args.slo_p99_ms and r["all"]["error_rate"] <= args.max_error_rate]
+        print(f"  {label:<14} {max(ok) if ok else 0} students" + ("" if ok else " (no tested load met the SLO)"))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
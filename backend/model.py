@@ -48,10 +48,11 @@ def map_to_four(emotion_label):
     # fallback
     return "neutral"
 
-def infer_emotion(image_np):
+def infer_emotion(image_np, on_error=None):
     """
     image_np: HxWx3 uint8 RGB image
     returns: one of ["happy", "neutral", "sad", "frustrated"]
+    on_error: optional callback receiving exceptions that were handled by falling back
     """
     # Try real model first
     mdl = try_load_model()
@@ -72,6 +73,8 @@ def infer_emotion(image_np):
             return map_to_four(label)
         except Exception as e:
             print("Model inference failed, falling back:", e)
+            if on_error:
+                on_error(e)
 
     # Fallback heuristic (works without model) - fast for demos:
     # Uses brightness (mean) and contrast/texture (std) over the detected face region.
@@ -139,12 +142,15 @@ def infer_emotion(image_np):
         return "neutral"
     except Exception as e:
         print("Fallback heuristic failed:", e)
+        if on_error:
+            on_error(e)
         return "neutral"
 
-def infer_emotion_detailed(image_np):
+def infer_emotion_detailed(image_np, on_error=None):
     """
     Returns a tuple: (emotion: str, confidence: float, face_found: bool)
     Uses face detection + heuristic; if Keras model available, can be extended to use softmax confidence.
+    on_error: optional callback receiving the exception when it falls back to neutral.
     """
     face_found = False
     try:
@@ -208,4 +214,6 @@ def infer_emotion_detailed(image_np):
         return emotion, conf, face_found
     except Exception as e:
         print("infer_emotion_detailed failed:", e)
+        if on_error:
+            on_error(e)
         return 'neutral', 0.0, False
@@ -0,0 +1,161 @@
+"""
+profiler.py - on-demand diagnostics for a live worker.
+
+Two tools, both off unless configured:
+  - SamplingProfiler: a background thread that snapshots every thread's stack
+    via sys._current_frames() and aggregates them into collapsed-stack lines
+    ("frame;frame;frame count"), the input format of flamegraph.pl/speedscope.
+  - StageTimer: per-request stage timings for a tagged fraction of requests
+    (PROFILE_SAMPLE_RATE). Untagged requests get NULL_TIMER, whose methods do
+    nothing, so the cost when disabled is one comparison per request.
+"""
+
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+PROFILE_TOKEN = os.environ.get("DEBUG_PROFILE_TOKEN", "")
+PROFILE_MAX_SECONDS = 60
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0") or 0)
+
+_RECENT_TIMINGS: deque = deque(maxlen=200)
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class SamplingProfiler:
+    """Sample all thread stacks at `hz` for `seconds` and count collapsed stacks."""
+
+    def __init__(self, seconds: float, hz: int = 100, out_path: str | None = None):
+        self.out_path = out_path
+        self.seconds = max(0.1, min(float(seconds), PROFILE_MAX_SECONDS))
+        self.interval = 1.0 / max(1, min(int(hz), 1000))
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self.started_at = None
+        self.finished_at = None
+        self._thread = None
+
+    def _run(self):
+        me = threading.get_ident()
+        names = {}
+        deadline = time.monotonic() + self.seconds
+        while time.monotonic() < deadline:
+            for t in threading.enumerate():
+                names[t.ident] = t.name
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                self.counts[";".join(reversed(stack))] += 1
+            self.samples += 1
+            time.sleep(self.interval)
+        self.finished_at = time.time()
+        if self.out_path:
+            # Other workers serve /debug/profile/last?pid= from this file
+            try:
+                tmp = f"{self.out_path}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(self.collapsed())
+                os.replace(tmp, self.out_path)
+            except OSError:
+                logging.exception("writing profile %s failed", self.out_path)
+
+    def start(self):
+        self.started_at = time.time()
+        if self.out_path:
+            os.makedirs(os.path.dirname(self.out_path), exist_ok=True)
+            try:
+                os.remove(self.out_path)
+            except FileNotFoundError:
+                pass
+        self._thread = threading.Thread(target=self._run, name="funlearn-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def join(self):
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.counts.most_common())
+
+
+class StageTimer:
+    """Records elapsed milliseconds between successive mark() calls."""
+
+    enabled = True
+
+    def __init__(self, name: str):
+        self.name = name
+        self.stages: list[tuple[str, float]] = []
+        self.notes: dict[str, str] = {}
+        self._t0 = self._last = time.perf_counter()
+
+    def mark(self, stage: str):
+        now = time.perf_counter()
+        self.stages.append((stage, (now - self._last) * 1000.0))
+        self._last = now
+
+    def note(self, key: str, value):
+        self.notes[key] = str(value)
+
+    def finish(self) -> dict:
+        total = (time.perf_counter() - self._t0) * 1000.0
+        entry = {
+            "name": self.name,
+            "timestamp": time.time(),
+            "total_ms": round(total, 3),
+            "stages": {k: round(v, 3) for k, v in self.stages},
+            "notes": self.notes,
+        }
+        _RECENT_TIMINGS.append(entry)
+        return entry
+
+    def server_timing(self) -> str:
+        return ", ".join(f"{k};dur={v:.1f}" for k, v in self.stages)
+
+
+class _NullTimer:
+    enabled = False
+
+    def mark(self, stage):
+        pass
+
+    def note(self, key, value):
+        pass
+
+    def finish(self):
+        return None
+
+    def server_timing(self):
+        return ""
+
+
+NULL_TIMER = _NullTimer()
+
+
+def stage_timer(name: str, force: bool = False):
+    """Return a StageTimer for a tagged request, NULL_TIMER otherwise."""
+    if force or (PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE):
+        return StageTimer(name)
+    return NULL_TIMER
+
+
+def recent_timings() -> list[dict]:
+    return list(_RECENT_TIMINGS)
@@ -0,0 +1,109 @@
+"""
+Tests for the partitioned emotion store.
+Run: python -m pytest backend/test_emotion_store.py
+"""
+import os
+import sqlite3
+
+import pytest
+
+from emotion_store import PartitionedEmotionStore, tenant_slug, _ATTACH_BATCH, _is_sealed
+
+
+def _save(store, ts, user="u", tenant=None):
+    store.save(user, "Math", "a1", "happy", ts, None, tenant=tenant)
+
+
+def test_tenant_slug():
+    assert tenant_slug(None) is None
+    assert tenant_slug("") is None
+    assert tenant_slug("Oak Hill/../x") == "Oak_Hill_x"
+    assert tenant_slug("!!!") is None
+    assert len(tenant_slug("a" * 200)) == 64
+
+
+def test_save_routes_by_day_and_tenant(tmp_path):
+    store = PartitionedEmotionStore(str(tmp_path))
+    _save(store, "2026-10-19T08:00:00Z")
+    _save(store, "2026-10-19T09:00:00Z", tenant="Oak Hill")
+    assert sorted(n for n in os.listdir(tmp_path) if n.endswith(".sqlite3")) == ["emotions-2026-10-19--Oak_Hill.sqlite3", "emotions-2026-10-19.sqlite3"]
+    assert [p[1] for p in store.partitions(all_tenants=True)] == [None, "Oak_Hill"]
+    assert len(store.query("2026-10-19", "2026-10-19")) == 1
+    assert len(store.query("2026-10-19", "2026-10-19", tenant="Oak Hill")) == 1
+    assert len(store.query("2026-10-19", "2026-10-19", all_tenants=True)) == 2
+
+
+def test_query_merges_batches_in_timestamp_order(tmp_path):
+    store = PartitionedEmotionStore(str(tmp_path), max_open=100)
+    n = _ATTACH_BATCH + 3
+    for i in range(n):
+        # Later schools write earlier timestamps so per-batch ordering is not enough
+        _save(store, f"2026-10-19T10:{n - i:02d}:00Z", tenant=f"school{i:02d}")
+    rows = store.query("2026-10-19", "2026-10-19", all_tenants=True)
+    ts = [r["timestamp"] for r in rows]
+    assert len(ts) == n
+    assert ts == sorted(ts)
+
+
+def test_query_only_attaches_range_and_includes_legacy(tmp_path):
+    store = PartitionedEmotionStore(str(tmp_path / "parts"))
+    _save(store, "2026-10-18T10:00:00Z")
+    _save(store, "2026-10-19T10:00:00Z")
+    assert [p[0].isoformat() for p in store.partitions("2026-10-19", "2026-10-19")] == ["2026-10-19"]
+    legacy = str(tmp_path / "emotions.sqlite3")
+    with sqlite3.connect(legacy) as conn:
+        conn.execute("CREATE TABLE emotions (id INTEGER PRIMARY KEY, user TEXT, module TEXT, activity TEXT, emotion TEXT, timestamp TEXT, session TEXT)")
+        conn.execute("INSERT INTO emotions (user, emotion, timestamp) VALUES ('old', 'sad', '2026-10-19T07:00:00Z')")
+    rows = store.query("2026-10-19", "2026-10-19", legacy_path=legacy)
+    assert [r["user"] for r in rows] == ["old", "u"]
+    rows = store.query("2026-10-19", "2026-10-19", legacy_path=legacy, partitioned=False)
+    assert [r["user"] for r in rows] == ["old"]
+
+
+def test_writer_connections_are_capped_per_thread(tmp_path):
+    store = PartitionedEmotionStore(str(tmp_path), max_open=3)
+    for i in range(12):
+        _save(store, "2026-10-19T10:00:00Z", tenant=f"s{i}")
+    assert len(store._conns()) == 3
+
+
+def test_new_day_seals_earlier_partitions(tmp_path):
+    store = PartitionedEmotionStore(str(tmp_path))
+    _save(store, "2026-10-18T23:59:00Z")
+    old = store.partition_path("2026-10-18")
+    assert not _is_sealed(old)
+    _save(store, "2026-10-19T00:01:00Z")
+    assert _is_sealed(old)
+    assert not os.path.exists(old + "-wal")
+    assert old not in store._conns()
+    with pytest.raises(ValueError):
+        _save(store, "2026-10-18T23:59:30Z")
+    # Sealed partitions stay readable
+    assert len(store.query("2026-10-18", "2026-10-19")) == 2
+
+
+def test_failed_seal_is_retried(tmp_path):
+    store = PartitionedEmotionStore(str(tmp_path))
+    _save(store, "2026-10-18T23:59:00Z")
+    old = store.partition_path("2026-10-18")
+    # Another worker still has yesterday's partition open
+    other = sqlite3.connect(old)
+    other.execute("SELECT COUNT(*) FROM emotions").fetchall()
+    _save(store, "2026-10-19T00:01:00Z")
+    assert not _is_sealed(old)
+    assert store._seal_pending is not None
+    other.close()
+    store._seal_retry_at = 0
+    _save(store, "2026-10-19T00:02:00Z")
+    assert _is_sealed(old)
+    assert store._seal_pending is None
+
+
+def test_archive_moves_sealed_partitions(tmp_path):
+    store = PartitionedEmotionStore(str(tmp_path / "parts"))
+    _save(store, "2026-10-17T10:00:00Z")
+    _save(store, "2026-10-18T10:00:00Z")
+    moved = store.archive(str(tmp_path / "archive"), before="2026-10-18")
+    assert [os.path.basename(p) for p in moved] == ["emotions-2026-10-17.sqlite3"]
+    assert [p[0].isoformat() for p in store.partitions()] == ["2026-10-18"]
+    assert store.seal(before="2026-10-18") == []
@@ -1,5 +1,6 @@
-const CACHE_NAME = 'funlearn-v1';
+const CACHE_NAME = 'funlearn-v2';
 const OFFLINE_URL = '/offline.html';
+const CONTENT_API_PATHS = ['/api/modules', '/api/activities/', '/api/activity/'];
 
 const ASSETS_TO_CACHE = [
   '/',
@@ -42,13 +43,22 @@ self.addEventListener('fetch', (event) => {
   // Skip cross-origin requests
   if (!event.request.url.startsWith(self.location.origin)) return;
   
-  // Handle API requests differently (network-first with timeout)
+  // Handle API requests differently (network-first with timeout).
+  // Content APIs send ETags, so the network leg is usually a cheap 304
+  // revalidation against the HTTP cache; keep a copy of those (and only those,
+  // never per-child data) for offline use.
   if (event.request.url.includes('/api/')) {
+    const url = new URL(event.request.url);
     event.respondWith(
       Promise.race([
         fetch(event.request.clone())
           .then((response) => {
             if (!response.ok) throw new Error('Network response was not ok');
+            if (event.request.method === 'GET' && CONTENT_API_PATHS.some((p) => url.pathname.startsWith(p))) {
+              const responseToCache = response.clone();
+              caches.open(CACHE_NAME)
+                .then((cache) => cache.put(event.request, responseToCache));
+            }
             return response;
           }),
         new Promise((_, reject) => 
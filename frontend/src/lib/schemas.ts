@@ -47,6 +47,7 @@ export const ProgressResponse = z.array(ProgressRecord);
 
 export const EmotionResponse = z.object({
   emotion: z.string(),
+  next_poll_ms: z.number().optional(),
 });
 
 export const RecommendationsResponse = z.object({